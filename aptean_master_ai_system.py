@@ -3,16 +3,69 @@
 # ===========================================================
 # Integrates: Geographic Routing + Currency Standardization + Vendor Verification + Multi-Regional Fraud Detection
 
+import os
+import sys
 import re
 import json
+import time
+import logging
+import bisect
+import copy
+import itertools
+import zlib
 import hashlib
 import difflib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
-from typing import Dict, List, Tuple, Optional
+from typing import Deque, Dict, Iterable, List, Tuple, Optional
 from datetime import datetime, timedelta
 import random
 
-@dataclass
+try:
+    from rapidfuzz import fuzz, process
+except ImportError:  # optional C++ similarity backend; difflib is used when it is not installed
+    fuzz = process = None
+
+# Text helpers shared with the standalone fraud detector
+from aptean_multi_regional_fraud_detector import _scannable_lower, _similarity_scores
+
+# Per-invoice progress is logged at DEBUG; WARNING by default so batch runs skip formatting it
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+# Interned category strings shared by the analyzers and the decision engine
+_STATUS_LEGITIMATE = sys.intern("LEGITIMATE")
+_STATUS_FRAUDULENT = sys.intern("FRAUDULENT")
+_STATUS_UNKNOWN = sys.intern("UNKNOWN")
+_RISK_MEDIUM = sys.intern("MEDIUM")
+_RISK_CRITICAL = sys.intern("CRITICAL")
+_FRAUD_TYPE_DUPLICATE = sys.intern("Multi-Regional Duplicate Attack")
+_RECOMMEND_BLOCK_FRAUD = sys.intern("🚨 BLOCK - High fraud risk detected")
+_RECOMMEND_BLOCK_VENDOR = sys.intern("🚨 BLOCK - Fraudulent vendor detected")
+_RECOMMEND_MANUAL_REVIEW = sys.intern("⚠️ MANUAL REVIEW - Critical risk requires approval")
+_RECOMMEND_APPROVE = sys.intern("✅ APPROVE - All checks passed")
+_RECOMMEND_ENHANCED = sys.intern("⚡ ENHANCED VERIFICATION - Additional checks required")
+_RECOMMEND_INSUFFICIENT = sys.intern("❓ INSUFFICIENT DATA - Gather more information")
+
+_EMPTY_MINHASH_BIN = 1 << 32
+# _SIMHASH_BIT_TABLES[j] maps a byte to its bit j, so bytes.translate(...).count(1) counts set bits per column
+_SIMHASH_BIT_TABLES = [bytes((value >> bit) & 1 for value in range(256)) for bit in range(8)]
+
+class _NumericCharTable(dict):
+    """str.translate table keeping exactly what [\\d.,] matches: decimal digits (any script), '.' and ','"""
+
+    def __missing__(self, codepoint: int) -> Optional[int]:
+        char = chr(codepoint)
+        kept = codepoint if char.isdecimal() or char in '.,' else None
+        self[codepoint] = kept
+        return kept
+
+def _iso(epoch: float) -> str:
+    """Local-time ISO 8601 string for epoch seconds"""
+    return datetime.fromtimestamp(epoch).isoformat()
+
+@dataclass(slots=True)
 class ProcessingResult:
     invoice_id: str
     geographic_routing: Dict
@@ -25,6 +78,17 @@ class ProcessingResult:
     business_impact: Dict
     audit_trail: List[Dict]
 
+@dataclass(eq=False, slots=True)  # identity equality/hash, so LSH buckets and candidate sets compare by record
+class FingerprintRecord:
+    timestamp: float  # epoch seconds
+    invoice_id: str
+    region: str
+    content_fingerprint: str
+    usd_amount: float
+    lsh_keys: Tuple[int, ...]  # the record's LSH bucket keys, kept for eviction
+    simhash: int  # 64-bit SimHash of the content fingerprint
+    sequence: int  # insertion order, to break timestamp ties
+
 class ApteanAIMasterSystem:
     def __init__(self):
         """Initialize the Master AI System with all components"""
@@ -39,6 +103,22 @@ class ApteanAIMasterSystem:
             "Canada": {"currency": "CAD", "timezone": "EST/PST", "language": "English"}
         }
 
+        self.language_indicators = {
+            'German': ['Rechnung', 'Betrag', 'Datum', 'USt-IdNr', 'MwSt', 'Deutschland'],
+            'English': ['Invoice', 'Amount', 'Total', 'Payment', 'Tax'],
+            'Hindi': ['रुपये', 'बिल', 'चालान'], 
+            'French': ['Facture', 'Montant', 'TVA', 'France']
+        }
+
+        self.location_indicators = {
+            'Germany': ['Deutschland', 'München', 'Berlin', 'Hamburg'],
+            'USA': ['USA', 'United States', 'California', 'New York'], 
+            'UK': ['United Kingdom', 'London', 'Birmingham'],
+            'India': ['India', 'Bangalore', 'Mumbai', 'Delhi'],
+            'France': ['France', 'Paris', 'Lyon'],
+            'Canada': ['Canada', 'Toronto', 'Vancouver']
+        }
+
         # CURRENCY STANDARDIZATION CONFIG
         self.currency_rates_to_usd = {
             "USD": 1.0, "EUR": 1.18, "GBP": 1.28, "INR": 0.012, "CAD": 0.74, "JPY": 0.0067
@@ -75,11 +155,93 @@ class ApteanAIMasterSystem:
             r"Amazone|Amazoon|Amzon"   # Amazon misspellings
         ]
 
+        self.vendor_patterns = [
+            r"From:\s*(.+?)\n",
+            r"Vendor:\s*(.+?)\n", 
+            r"Supplier:\s*(.+?)\n",
+            r"Company:\s*(.+?)\n"
+        ]
+
+        # PRECOMPILED PATTERNS (compiled once, reused for every invoice)
+        # Lowercased and case-sensitive: they scan pre-lowercased text instead of using re.IGNORECASE
+        # (the patterns only use lowercase escapes such as \s and \d, so .lower() keeps their meaning)
+        # One (currency, pattern) pair per currency pattern, each scanned on its own: a shared
+        # alternation would let one pattern's match hide an overlapping match of another
+        # (e.g. the '$' in 'C$ 300' counts for both CAD and USD)
+        self._CURRENCY_RES = tuple(
+            (currency, re.compile(pattern.lower()))
+            for currency, patterns in self.currency_patterns.items() for pattern in patterns
+        )
+        self._currency_order = list(self.currency_patterns)
+        # Original-case twins for texts _scannable_lower rejects (e.g. 'İ', 'ı', 'ſ')
+        self._CURRENCY_IGNORECASE_RES = tuple(
+            (currency, re.compile(pattern, re.IGNORECASE))
+            for currency, patterns in self.currency_patterns.items() for pattern in patterns
+        )
+        # fraud_patterns are plain literal alternations, combined into one lowercase literal alternation
+        fraud_literals = {literal.lower() for pattern in self.fraud_patterns for literal in pattern.split("|")}
+        self._fraud_literal_re = re.compile("|".join(
+            re.escape(literal) for literal in sorted(fraud_literals, key=len, reverse=True)
+        ))
+        self._vendor_patterns_compiled = [re.compile(pattern.lower()) for pattern in self.vendor_patterns]
+        # Original-case fallbacks for texts _scannable_lower rejects
+        self._vendor_patterns_ignorecase = [re.compile(pattern, re.IGNORECASE) for pattern in self.vendor_patterns]
+        self._fraud_patterns_ignorecase = [re.compile(pattern, re.IGNORECASE) for pattern in self.fraud_patterns]
+        self._numeric_chars = _NumericCharTable()
+
+        # Content fingerprint normalization: currency symbols | amounts | invoice numbers in one pass.
+        # Invoice number tails stop at digits because amounts used to be replaced before them.
+        self._FP_RE = re.compile(r'([\$€£₹¥])|(\d+[,.]?\d*)|(invoice\s*#?:?\s*[a-z-]+)')
+        self._FP_TOKENS = (None, 'CURRENCY', 'AMOUNT', 'INVOICE_ID')
+        self._FP_WS = re.compile(r'\s+')
+
+        # Language/location keyword scanner (one pass over the text for all keywords)
+        tagged_keywords = [("lang", language, keyword) for language, keywords in self.language_indicators.items() for keyword in keywords]
+        tagged_keywords += [("loc", region, keyword) for region, keywords in self.location_indicators.items() for keyword in keywords]
+        self._keyword_scanner, self._keyword_tags, self._keyword_credits = self._build_keyword_scanner(tagged_keywords)
+
+        # Flattened (variation, vendor, risk_level) lookup table for similarity matching
+        self._vendor_choices = [
+            (variation.lower(), legit_vendor, details["risk_level"])
+            for legit_vendor, details in self.legitimate_vendors.items()
+            for variation in details["variations"]
+        ]
+        self._vendor_choice_names = [name for name, _, _ in self._vendor_choices]
+        self._vendor_choice_lengths = [len(name) for name in self._vendor_choice_names]
+
+        # Region scoring profiles: (region, language, currency) in regional_centers order
+        self._region_profiles = [
+            (region, config['language'], config['currency']) for region, config in self.regional_centers.items()
+        ]
+
         # MULTI-REGIONAL FRAUD DETECTION CONFIG
-        self.cross_regional_database = []
+        # region -> fingerprint records in arrival (time) order
+        self.cross_regional_database: Dict[str, Deque[FingerprintRecord]] = {}
+        self._db_size = 0  # records across all regions
+        self._record_sequence = itertools.count()
         self.similarity_threshold = 0.85
         self.time_window_hours = 72
 
+        # MinHash/LSH duplicate prefilter over 5-byte shingles of the content fingerprint.
+        # 21 bands x 3 rows keeps recall ~99.5% at the shingle Jaccard (~0.6) of pairs above the
+        # similarity threshold: the rest share no bucket and are never scored (5 of 1260 mutated
+        # pairs above 0.85 in testing). Pairs of unrelated invoices rarely share a bucket.
+        self.minhash_num_perm = 64
+        self.lsh_band_rows = 3
+        # Hashed band key -> records in that bucket (lists: most buckets hold a single record)
+        self._lsh_buckets: Dict[int, List[FingerprintRecord]] = {}
+
+        # 64-bit SimHash over 3-byte shingles. Its bit noise grows as the shingle count drops:
+        # mutated pairs above the similarity threshold reach 17+ differing bits below ~200 bytes
+        # but stay within 10 from 256 bytes up, so shorter records skip the gate and rely on
+        # the LSH buckets and the exact ratio check
+        self.simhash_max_distance = 16
+        self.simhash_min_length = 256
+
+        # Batches smaller than this run serially in process_invoices: starting worker processes
+        # costs more than the read-only stages of a few dozen invoices
+        self.pool_min_batch_size = 32
+
         # PROCESSING METRICS
         self.processing_stats = {
             "total_invoices_processed": 0,
@@ -91,49 +253,129 @@ class ApteanAIMasterSystem:
     def process_invoice(self, invoice_data: Dict) -> ProcessingResult:
         """Master function - processes invoice through all AI components"""
 
-        start_time = datetime.now()
+        return self._process_invoice(invoice_data, self._stateless_stages(invoice_data))
+
+    def process_invoices(self, invoices: List[Dict], max_workers: Optional[int] = None) -> List[ProcessingResult]:
+        """Batch entry point - processes invoices in order, running the read-only stages on a process pool"""
+
+        if len(invoices) <= 1:
+            return [self.process_invoice(invoice_data) for invoice_data in invoices]
+
+        max_workers = min(max_workers or os.cpu_count() or 1, len(invoices))
+        if max_workers > 1 and len(invoices) >= self.pool_min_batch_size:
+            # Contiguous chunks keep results in input order and let each worker batch its currency scan
+            chunk_size = -(-len(invoices) // max_workers)
+            chunks = [invoices[i:i + chunk_size] for i in range(0, len(invoices), chunk_size)]
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_stage_worker, initargs=(self._stage_worker_copy(),)) as executor:
+                batch_stages = [stages for chunk_stages in executor.map(_run_stateless_stages, chunks) for stages in chunk_stages]
+        else:
+            batch_stages = self._batch_stateless_stages(invoices)
+
+        # The fraud stage reads and writes cross_regional_database, so it runs serially here
+        return [self._process_invoice(invoice_data, stages) for invoice_data, stages in zip(invoices, batch_stages)]
+
+    def _stage_worker_copy(self) -> "ApteanAIMasterSystem":
+        """Copy of this instance for the worker processes: its configuration, without the fraud database"""
+
+        worker_system = copy.copy(self)
+        worker_system.cross_regional_database = {}
+        worker_system._lsh_buckets = {}
+        worker_system._record_sequence = None  # only the fraud stage numbers records
+        return worker_system
+
+    def _batch_stateless_stages(self, invoices: List[Dict]) -> List[Dict]:
+        """_stateless_stages for many invoices, sharing one currency scan across the batch"""
+
+        # Lowercased once here and handed to each invoice's stages along with its currency scan
+        invoice_texts_lower = [invoice_data.get('invoice_text', '').lower() for invoice_data in invoices]
+        batch_currencies = self._batch_detect_currency_and_amounts(
+            invoice_texts_lower, [invoice_data.get('invoice_text', '') for invoice_data in invoices]
+        )
+        return [
+            self._stateless_stages(invoice_data, currency_scan, invoice_text_lower)
+            for invoice_data, currency_scan, invoice_text_lower in zip(invoices, batch_currencies, invoice_texts_lower)
+        ]
+
+    def _stateless_stages(self, invoice_data: Dict,
+                          currency_scan: Optional[Tuple[Optional[str], Dict[str, float]]] = None,
+                          invoice_text_lower: Optional[str] = None) -> Dict:
+        """Run the stages that do not touch shared state (safe to run in a worker process)"""
+
+        start_time = time.monotonic()
+
+        # Read and lowercase the text once; every stage shares these
+        invoice_text = invoice_data.get('invoice_text', '')
+        if invoice_text_lower is None:
+            invoice_text_lower = invoice_text.lower()
+
+        # One currency scan feeds both geographic routing and currency standardization
+        if currency_scan is None:
+            currency_scan = self._detect_currency_and_amounts(invoice_text_lower, invoice_text)
+        detected_currency, detected_amounts = currency_scan
+
+        content_fingerprint = self._create_content_fingerprint(invoice_text_lower)
+
+        stages = {
+            "geographic_routing": self._geographic_routing_analysis(invoice_data, invoice_text_lower, detected_currency),
+            "currency_conversion": self._currency_standardization_analysis(invoice_data, invoice_text_lower, detected_amounts),
+            "vendor_verification": self._vendor_verification_analysis(invoice_data, invoice_text, invoice_text_lower),
+            "content_fingerprint": content_fingerprint,
+            "content_minhash": self._content_minhash(content_fingerprint),
+            "content_simhash": self._content_simhash(content_fingerprint)
+        }
+        stages["processing_time_seconds"] = time.monotonic() - start_time
+
+        return stages
+
+    def _process_invoice(self, invoice_data: Dict, stages: Dict) -> ProcessingResult:
+        """Combine precomputed stage results with fraud detection and the final decision"""
+
+        start_time = time.monotonic()
         audit_trail = []
 
-        print(f"🤖 PROCESSING INVOICE: {invoice_data.get('invoice_id', 'UNKNOWN')}")
-        print("=" * 60)
+        logger.debug("🤖 PROCESSING INVOICE: %s", invoice_data.get('invoice_id', 'UNKNOWN'))
+        logger.debug("=" * 60)
 
         # STEP 1: GEOGRAPHIC ROUTING
-        print("🌍 STEP 1: Geographic Routing Analysis...")
-        geographic_result = self._geographic_routing_analysis(invoice_data)
-        audit_trail.append({"step": "geographic_routing", "timestamp": datetime.now().isoformat(), "result": geographic_result})
-        print(f"   ✅ Routed to: {geographic_result['region']} ({geographic_result['confidence']:.1%} confidence)")
+        logger.debug("🌍 STEP 1: Geographic Routing Analysis...")
+        geographic_result = stages["geographic_routing"]
+        audit_trail.append({"step": "geographic_routing", "timestamp": time.time(), "result": geographic_result})
+        logger.debug("   ✅ Routed to: %s (%.1f%% confidence)", geographic_result['region'], geographic_result['confidence'] * 100)
 
         # STEP 2: CURRENCY STANDARDIZATION
-        print("💱 STEP 2: Currency Standardization...")
-        currency_result = self._currency_standardization_analysis(invoice_data)
-        audit_trail.append({"step": "currency_conversion", "timestamp": datetime.now().isoformat(), "result": currency_result})
+        logger.debug("💱 STEP 2: Currency Standardization...")
+        currency_result = stages["currency_conversion"]
+        audit_trail.append({"step": "currency_conversion", "timestamp": time.time(), "result": currency_result})
         if currency_result['conversion_performed']:
-            print(f"   ✅ Converted: {currency_result['original_amount']} {currency_result['original_currency']} → ${currency_result['usd_amount']} USD")
+            logger.debug("   ✅ Converted: %s %s → $%s USD",
+                         currency_result['original_amount'], currency_result['original_currency'], currency_result['usd_amount'])
         else:
-            print(f"   ✅ Already in USD: ${currency_result['usd_amount']}")
+            logger.debug("   ✅ Already in USD: $%s", currency_result['usd_amount'])
 
         # STEP 3: VENDOR VERIFICATION
-        print("🔍 STEP 3: Vendor Verification...")
-        vendor_result = self._vendor_verification_analysis(invoice_data)
-        audit_trail.append({"step": "vendor_verification", "timestamp": datetime.now().isoformat(), "result": vendor_result})
-        print(f"   ✅ Vendor Status: {vendor_result['legitimacy_status']} ({vendor_result['confidence']:.1%} confidence)")
+        logger.debug("🔍 STEP 3: Vendor Verification...")
+        vendor_result = stages["vendor_verification"]
+        audit_trail.append({"step": "vendor_verification", "timestamp": time.time(), "result": vendor_result})
+        logger.debug("   ✅ Vendor Status: %s (%.1f%% confidence)", vendor_result['legitimacy_status'], vendor_result['confidence'] * 100)
 
         # STEP 4: MULTI-REGIONAL FRAUD DETECTION
-        print("🚨 STEP 4: Multi-Regional Fraud Detection...")
-        fraud_result = self._multi_regional_fraud_analysis(invoice_data, currency_result['usd_amount'])
-        audit_trail.append({"step": "fraud_detection", "timestamp": datetime.now().isoformat(), "result": fraud_result})
+        logger.debug("🚨 STEP 4: Multi-Regional Fraud Detection...")
+        fraud_result = self._multi_regional_fraud_analysis(
+            invoice_data, currency_result['usd_amount'],
+            stages["content_fingerprint"], stages["content_minhash"], stages["content_simhash"]
+        )
+        audit_trail.append({"step": "fraud_detection", "timestamp": time.time(), "result": fraud_result})
         if fraud_result['fraud_detected']:
-            print(f"   🚨 FRAUD ALERT: {fraud_result['fraud_type']} ({fraud_result['confidence']:.1%} confidence)")
+            logger.debug("   🚨 FRAUD ALERT: %s (%.1f%% confidence)", fraud_result['fraud_type'], fraud_result['confidence'] * 100)
         else:
-            print(f"   ✅ No fraud detected - Safe to process")
+            logger.debug("   ✅ No fraud detected - Safe to process")
 
         # STEP 5: FINAL DECISION ENGINE
-        print("🎯 STEP 5: Final Decision Engine...")
+        logger.debug("🎯 STEP 5: Final Decision Engine...")
         final_decision = self._make_final_decision(geographic_result, currency_result, vendor_result, fraud_result)
 
         # Calculate processing time
-        end_time = datetime.now()
-        processing_time = (end_time - start_time).total_seconds()
+        processing_time = stages["processing_time_seconds"] + (time.monotonic() - start_time)
 
         # Calculate business impact
         business_impact = self._calculate_comprehensive_business_impact(
@@ -143,9 +385,13 @@ class ApteanAIMasterSystem:
         # Update system statistics
         self._update_system_stats(fraud_result, currency_result)
 
-        print(f"\n🎯 FINAL RECOMMENDATION: {final_decision['recommendation']}")
-        print(f"📊 Overall Confidence: {final_decision['confidence']:.1%}")
-        print(f"⏱️  Processing Time: {processing_time:.2f} seconds")
+        logger.debug("\n🎯 FINAL RECOMMENDATION: %s", final_decision['recommendation'])
+        logger.debug("📊 Overall Confidence: %.1f%%", final_decision['confidence'] * 100)
+        logger.debug("⏱️  Processing Time: %.2f seconds", processing_time)
+
+        # Audit steps record epoch seconds; format them for the returned trail only
+        for entry in audit_trail:
+            entry["timestamp"] = _iso(entry["timestamp"])
 
         return ProcessingResult(
             invoice_id=invoice_data.get('invoice_id', 'UNKNOWN'),
@@ -160,72 +406,31 @@ class ApteanAIMasterSystem:
             audit_trail=audit_trail
         )
 
-    def _geographic_routing_analysis(self, invoice_data: Dict) -> Dict:
-        """AI Geographic Routing Analysis"""
+    def _geographic_routing_analysis(self, invoice_data: Dict, invoice_text_lower: str, detected_currency: Optional[str]) -> Dict:
+        """AI Geographic Routing Analysis (detected_currency: first currency with a pattern match)"""
 
-        invoice_text = invoice_data.get('invoice_text', '')
+        keyword_counts = self._scan_keywords(invoice_text_lower)
 
         # Detect language
         language_scores = {}
-        language_indicators = {
-            'German': ['Rechnung', 'Betrag', 'Datum', 'USt-IdNr', 'MwSt', 'Deutschland'],
-            'English': ['Invoice', 'Amount', 'Total', 'Payment', 'Tax'],
-            'Hindi': ['रुपये', 'बिल', 'चालान'], 
-            'French': ['Facture', 'Montant', 'TVA', 'France']
-        }
-
-        for language, indicators in language_indicators.items():
-            score = sum(1 for indicator in indicators if indicator.lower() in invoice_text.lower())
+        for language in self.language_indicators:
+            score = keyword_counts["lang"].get(language, 0)
             if score > 0:
                 language_scores[language] = score
 
-        # Detect currency
-        detected_currency = None
-        for currency, patterns in self.currency_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, invoice_text, re.IGNORECASE):
-                    detected_currency = currency
-                    break
-            if detected_currency:
-                break
-
         # Detect address/location
-        location_indicators = {
-            'Germany': ['Deutschland', 'München', 'Berlin', 'Hamburg'],
-            'USA': ['USA', 'United States', 'California', 'New York'], 
-            'UK': ['United Kingdom', 'London', 'Birmingham'],
-            'India': ['India', 'Bangalore', 'Mumbai', 'Delhi'],
-            'France': ['France', 'Paris', 'Lyon'],
-            'Canada': ['Canada', 'Toronto', 'Vancouver']
-        }
-
         location_scores = {}
-        for region, indicators in location_indicators.items():
-            score = sum(1 for indicator in indicators if indicator.lower() in invoice_text.lower())
+        for region in self.location_indicators:
+            score = keyword_counts["loc"].get(region, 0)
             if score > 0:
                 location_scores[region] = score
 
-        # Determine best region
-        region_scores = {}
-        for region, config in self.regional_centers.items():
-            score = 0.0
-
-            # Language match
-            if language_scores.get(config['language'], 0) > 0:
-                score += 0.4
-
-            # Currency match
-            if detected_currency == config['currency']:
-                score += 0.3
-
-            # Location match  
-            if location_scores.get(region, 0) > 0:
-                score += 0.3
-
-            region_scores[region] = score
-
-        best_region = max(region_scores.keys(), key=lambda x: region_scores[x]) if region_scores else "USA"
-        confidence = region_scores.get(best_region, 0.5)
+        # Determine best region: 0.4 language + 0.3 currency + 0.3 location match, first best wins
+        best_region, confidence = "USA", 0.5
+        for index, (region, language, currency) in enumerate(self._region_profiles):
+            score = 0.4 * (language in language_scores) + 0.3 * (detected_currency == currency) + 0.3 * (region in location_scores)
+            if index == 0 or score > confidence:
+                best_region, confidence = region, score
 
         return {
             "region": best_region,
@@ -235,39 +440,46 @@ class ApteanAIMasterSystem:
             "processing_pipeline": self.regional_centers[best_region]
         }
 
-    def _currency_standardization_analysis(self, invoice_data: Dict) -> Dict:
-        """AI Currency Standardization Analysis"""
+    @staticmethod
+    def _build_keyword_scanner(tagged_keywords: List[Tuple[str, str, str]]) -> Tuple[re.Pattern, Dict[str, List[Tuple[str, str]]], Dict[str, Tuple[str, ...]]]:
+        """Compile (kind, label, keyword) triples into a single multi-keyword scanner"""
 
-        invoice_text = invoice_data.get('invoice_text', '')
+        keyword_tags = {}
+        for kind, label, keyword in tagged_keywords:
+            keyword_tags.setdefault(keyword.lower(), []).append((kind, label))
+
+        # A keyword that is a prefix of a longer one starts at the same position, so a match
+        # on the longer keyword also credits the prefix (same result as per-keyword `in` checks)
+        keyword_credits = {
+            keyword: tuple(other for other in keyword_tags if keyword.startswith(other))
+            for keyword in keyword_tags
+        }
+
+        # Zero-width lookahead reports overlapping occurrences in a single left-to-right pass
+        alternation = '|'.join(re.escape(keyword) for keyword in sorted(keyword_tags, key=len, reverse=True))
+        return re.compile(f'(?=({alternation}))'), keyword_tags, keyword_credits
+
+    def _scan_keywords(self, text_lower: str) -> Dict[str, Dict[str, int]]:
+        """Count distinct indicator keywords per (kind, label) in one pass over the text"""
+
+        found = set()
+        for match in self._keyword_scanner.finditer(text_lower):
+            found.update(self._keyword_credits[match.group(1)])
+
+        counts = {"lang": {}, "loc": {}}
+        for keyword in found:
+            for kind, label in self._keyword_tags[keyword]:
+                counts[kind][label] = counts[kind].get(label, 0) + 1
+
+        return counts
+
+    def _currency_standardization_analysis(self, invoice_data: Dict, invoice_text_lower: str,
+                                           detected_amounts: Optional[Dict[str, float]] = None) -> Dict:
+        """AI Currency Standardization Analysis"""
 
         # Detect currency and amount
-        detected_amounts = {}
-
-        for currency, patterns in self.currency_patterns.items():
-            amounts = []
-            for pattern in patterns:
-                matches = re.findall(pattern, invoice_text, re.IGNORECASE)
-                for match in matches:
-                    # Extract numeric value
-                    numeric_text = re.sub(r'[^\d.,]', '', match)
-                    try:
-                        if ',' in numeric_text and '.' in numeric_text:
-                            # Assume . is decimal separator
-                            numeric_text = numeric_text.replace(',', '')
-                        elif ',' in numeric_text:
-                            # Could be thousand separator or decimal
-                            if len(numeric_text.split(',')[-1]) <= 2:
-                                numeric_text = numeric_text.replace(',', '.')
-                            else:
-                                numeric_text = numeric_text.replace(',', '')
-
-                        amount = float(numeric_text)
-                        amounts.append(amount)
-                    except:
-                        pass
-
-            if amounts:
-                detected_amounts[currency] = max(amounts)  # Take largest amount (likely total)
+        if detected_amounts is None:
+            _, detected_amounts = self._detect_currency_and_amounts(invoice_text_lower)
 
         if not detected_amounts:
             return {
@@ -302,58 +514,133 @@ class ApteanAIMasterSystem:
             "confidence": 0.9
         }
 
-    def _vendor_verification_analysis(self, invoice_data: Dict) -> Dict:
-        """AI Vendor Verification Analysis"""
+    def _detect_currency_and_amounts(self, invoice_text_lower: str,
+                                     invoice_text: Optional[str] = None) -> Tuple[Optional[str], Dict[str, float]]:
+        """First currency with a pattern match, and the largest amount found per currency (likely the total)"""
 
-        invoice_text = invoice_data.get('invoice_text', '')
+        # The original-case text is scanned with IGNORECASE when its lowercase form can't stand in for it
+        if invoice_text is None or _scannable_lower(invoice_text, invoice_text_lower) is not None:
+            scan_text, currency_res = invoice_text_lower, self._CURRENCY_RES
+        else:
+            scan_text, currency_res = invoice_text, self._CURRENCY_IGNORECASE_RES
 
-        # Extract vendor name
-        vendor_patterns = [
-            r"From:\s*(.+?)\n",
-            r"Vendor:\s*(.+?)\n", 
-            r"Supplier:\s*(.+?)\n",
-            r"Company:\s*(.+?)\n"
-        ]
+        return self._summarize_currency_matches(
+            (currency, match.group()) for currency, pattern in currency_res for match in pattern.finditer(scan_text)
+        )
+
+    def _batch_detect_currency_and_amounts(self, invoice_texts_lower: List[str],
+                                           invoice_texts: Optional[List[str]] = None) -> List[Tuple[Optional[str], Dict[str, float]]]:
+        """_detect_currency_and_amounts for many invoices, with one regex scan per pattern over the whole batch"""
+
+        # Texts whose lowercase form can't stand in for them are scanned on their own
+        batch_results: List[Optional[Tuple[Optional[str], Dict[str, float]]]] = [None] * len(invoice_texts_lower)
+        scannable = []
+        for index, invoice_text_lower in enumerate(invoice_texts_lower):
+            if invoice_texts is None or _scannable_lower(invoice_texts[index], invoice_text_lower) is not None:
+                scannable.append(index)
+            else:
+                batch_results[index] = self._detect_currency_and_amounts(invoice_text_lower, invoice_texts[index])
+
+        # NUL never matches a currency pattern, so no match can span two invoices
+        scannable_texts = [invoice_texts_lower[index] for index in scannable]
+        buffer = '\0'.join(scannable_texts)
+        offsets = list(itertools.accumulate((len(text) + 1 for text in scannable_texts[:-1]), initial=0))
+        batch_matches: List[List[Tuple[str, str]]] = [[] for _ in scannable_texts]
+
+        for currency, pattern in self._CURRENCY_RES:
+            for match in pattern.finditer(buffer):
+                batch_matches[bisect.bisect_right(offsets, match.start()) - 1].append((currency, match.group()))
+
+        for index, matches in zip(scannable, batch_matches):
+            batch_results[index] = self._summarize_currency_matches(matches)
+
+        return batch_results
+
+    def _summarize_currency_matches(self, matches: Iterable[Tuple[str, str]]) -> Tuple[Optional[str], Dict[str, float]]:
+        """Reduce (currency, matched text) pairs to the first currency and largest amounts, in currency_patterns order"""
+
+        matched_currencies = set()
+        amounts = {}
+        for currency, amount_text in matches:
+            matched_currencies.add(currency)
+            amount = self._parse_amount(amount_text)
+            if amount is not None:
+                amounts[currency] = max(amount, amounts.get(currency, amount))
+
+        # Config order, not text order: the primary currency tie-break depends on it
+        detected_currency = next((currency for currency in self._currency_order if currency in matched_currencies), None)
+        detected_amounts = {currency: amounts[currency] for currency in self._currency_order if currency in amounts}
+
+        return detected_currency, detected_amounts
+
+    def _parse_amount(self, amount_text: str) -> Optional[float]:
+        """Parse a matched currency amount, handling thousand/decimal separators"""
+
+        # Extract numeric value
+        numeric_text = amount_text.translate(self._numeric_chars)
+        if ',' in numeric_text and '.' in numeric_text:
+            # Assume . is decimal separator
+            numeric_text = numeric_text.replace(',', '')
+        elif ',' in numeric_text:
+            # Could be thousand separator or decimal
+            if len(numeric_text) - numeric_text.rfind(',') <= 3:  # at most 2 digits after the last comma
+                numeric_text = numeric_text.replace(',', '.')
+            else:
+                numeric_text = numeric_text.replace(',', '')
+
+        try:
+            return float(numeric_text)
+        except ValueError:
+            return None
+
+    def _vendor_verification_analysis(self, invoice_data: Dict, invoice_text: str, invoice_text_lower: str) -> Dict:
+        """AI Vendor Verification Analysis"""
+
+        # Extract vendor name: match the lowercased text, then slice the original-case name
+        # (IGNORECASE on the original text when the lowercased one can't stand in for it)
+        if _scannable_lower(invoice_text, invoice_text_lower) is not None:
+            scan_text, patterns = invoice_text_lower, self._vendor_patterns_compiled
+        else:
+            scan_text, patterns = invoice_text, self._vendor_patterns_ignorecase
 
         vendor_name = ""
-        for pattern in vendor_patterns:
-            match = re.search(pattern, invoice_text, re.IGNORECASE)
+        for pattern in patterns:
+            match = pattern.search(scan_text)
             if match:
-                vendor_name = match.group(1).strip()
+                vendor_name = invoice_text[match.start(1):match.end(1)].strip()
                 break
 
         if not vendor_name:
             return {
-                "legitimacy_status": "UNKNOWN",
+                "legitimacy_status": _STATUS_UNKNOWN,
                 "confidence": 0.5,
-                "risk_level": "MEDIUM",
+                "risk_level": _RISK_MEDIUM,
                 "vendor_name": "Not detected",
                 "fraud_indicators": []
             }
 
         # Check against legitimate vendors
-        legitimacy_status = "UNKNOWN"
+        legitimacy_status = _STATUS_UNKNOWN
         confidence = 0.5
-        risk_level = "MEDIUM"
+        risk_level = _RISK_MEDIUM
         fraud_indicators = []
 
-        for legit_vendor, details in self.legitimate_vendors.items():
-            for variation in details["variations"]:
-                similarity = difflib.SequenceMatcher(None, vendor_name.lower(), variation.lower()).ratio()
-                if similarity > 0.85:
-                    legitimacy_status = "LEGITIMATE"
-                    confidence = similarity
-                    risk_level = details["risk_level"]
-                    break
+        vendor_name_lower = vendor_name.lower()
+        vendor_match = self._match_legitimate_vendor(vendor_name_lower)
+        if vendor_match:
+            legitimacy_status = _STATUS_LEGITIMATE
+            confidence, risk_level = vendor_match
 
         # Check for fraud patterns
-        for pattern in self.fraud_patterns:
-            if re.search(pattern, vendor_name, re.IGNORECASE):
-                legitimacy_status = "FRAUDULENT"
-                confidence = 0.95
-                risk_level = "CRITICAL"
-                fraud_indicators.append("Misspelled legitimate vendor name")
-                break
+        if _scannable_lower(vendor_name, vendor_name_lower) is not None:
+            fraud_match = self._fraud_literal_re.search(vendor_name_lower)
+        else:
+            fraud_match = any(pattern.search(vendor_name) for pattern in self._fraud_patterns_ignorecase)
+        if fraud_match:
+            legitimacy_status = _STATUS_FRAUDULENT
+            confidence = 0.95
+            risk_level = _RISK_CRITICAL
+            fraud_indicators.append("Misspelled legitimate vendor name")
 
         return {
             "legitimacy_status": legitimacy_status,
@@ -363,54 +650,94 @@ class ApteanAIMasterSystem:
             "fraud_indicators": fraud_indicators
         }
 
-    def _multi_regional_fraud_analysis(self, invoice_data: Dict, usd_amount: float) -> Dict:
+    def _match_legitimate_vendor(self, vendor_name_lower: str) -> Optional[Tuple[float, str]]:
+        """Find a legitimate vendor variation above 85% similarity, as (similarity, risk_level)"""
+
+        if process is not None:
+            # score_cutoff is inclusive; the threshold is strictly above 85%, like the difflib path
+            best = process.extractOne(vendor_name_lower, self._vendor_choice_names, scorer=fuzz.ratio, score_cutoff=85)
+            if best is None or best[1] / 100.0 <= 0.85:
+                return None
+            _, score, index = best
+            return score / 100.0, self._vendor_choices[index][2]
+
+        # difflib fallback: first matching variation per vendor, last matching vendor wins
+        vendor_match = None
+        matched_vendor = None
+        name_length = len(vendor_name_lower)
+        for (variation, legit_vendor, risk_level), variation_length in zip(self._vendor_choices, self._vendor_choice_lengths):
+            if legit_vendor == matched_vendor:
+                continue
+            # ratio = 2*matches/total and matches <= the shorter length, so this bound rules the pair out
+            if 2.0 * min(name_length, variation_length) / (name_length + variation_length) <= 0.85:
+                continue
+            similarity = difflib.SequenceMatcher(None, vendor_name_lower, variation).ratio()
+            if similarity > 0.85:
+                vendor_match = (similarity, risk_level)
+                matched_vendor = legit_vendor
+
+        return vendor_match
+
+    def _multi_regional_fraud_analysis(self, invoice_data: Dict, usd_amount: float,
+                                       content_fingerprint: str, content_minhash: Tuple[int, ...],
+                                       content_simhash: int) -> Dict:
         """AI Multi-Regional Fraud Detection Analysis"""
 
-        invoice_text = invoice_data.get('invoice_text', '')
         invoice_id = invoice_data.get('invoice_id', '')
         region = invoice_data.get('region', 'Unknown')
 
-        # Create content fingerprint
-        content_fingerprint = self._create_content_fingerprint(invoice_text)
-
-        # Check against cross-regional database
-        potential_duplicates = []
-        current_time = datetime.now()
-
-        for existing_invoice in self.cross_regional_database:
-            # Skip same region
-            if existing_invoice.get('region') == region:
-                continue
-
-            # Check time window
-            existing_time = existing_invoice.get('timestamp', current_time)
-            if isinstance(existing_time, str):
-                try:
-                    existing_time = datetime.fromisoformat(existing_time)
-                except:
-                    existing_time = current_time
-
-            time_diff = abs((current_time - existing_time).total_seconds() / 3600)
-            if time_diff > self.time_window_hours:
-                continue
+        lsh_keys = self._lsh_keys(content_minhash)
+
+        # Check against cross-regional database (other regions, inside the time window only)
+        current_time = time.time()
+        window_seconds = self.time_window_hours * 3600
+
+        # Drop records older than the time window, so every indexed record is in range
+        self._evict_expired(current_time - window_seconds)
+
+        # Only records sharing an LSH bucket can be near-duplicates, so the scan is
+        # proportional to the bucket hits rather than to the records in the window
+        lsh_candidates = set()
+        for key in lsh_keys:
+            lsh_candidates.update(self._lsh_buckets.get(key, ()))
+
+        # Skip same region, then apply the SimHash Hamming prefilter (long fingerprints only)
+        max_distance = self.simhash_max_distance
+        min_length = self.simhash_min_length
+        query_gated = len(content_fingerprint) >= min_length
+        candidates = sorted(
+            (
+                record for record in lsh_candidates
+                if record.region != region and (
+                    not query_gated or len(record.content_fingerprint) < min_length
+                    or (record.simhash ^ content_simhash).bit_count() <= max_distance
+                )
+            ),
+            # Arrival order across regions (sequence numbers are global, so timestamp ties keep it too)
+            key=lambda record: record.sequence
+        )
 
-            # Check content similarity
-            existing_fingerprint = existing_invoice.get('content_fingerprint', '')
-            similarity = difflib.SequenceMatcher(None, content_fingerprint, existing_fingerprint).ratio()
+        # Check content similarity (all candidates scored in one batch)
+        similarities = _similarity_scores(
+            content_fingerprint,
+            [record.content_fingerprint for record in candidates]
+        )
 
+        potential_duplicates = []
+        for record, similarity in zip(candidates, similarities):
             if similarity > self.similarity_threshold:
                 potential_duplicates.append({
-                    'invoice_id': existing_invoice.get('invoice_id'),
-                    'region': existing_invoice.get('region'), 
+                    'invoice_id': record.invoice_id,
+                    'region': record.region, 
                     'similarity': similarity,
-                    'amount_usd': existing_invoice.get('usd_amount', 0),
-                    'time_diff_hours': time_diff
+                    'amount_usd': record.usd_amount,
+                    'time_diff_hours': abs(current_time - record.timestamp) / 3600
                 })
 
         # Fraud detection result
         if potential_duplicates:
             fraud_detected = True
-            fraud_type = "Multi-Regional Duplicate Attack"
+            fraud_type = _FRAUD_TYPE_DUPLICATE
             confidence = max(dup['similarity'] for dup in potential_duplicates)
             potential_loss = sum(dup['amount_usd'] for dup in potential_duplicates)
         else:
@@ -420,13 +747,21 @@ class ApteanAIMasterSystem:
             potential_loss = 0.0
 
         # Add current invoice to database
-        self.cross_regional_database.append({
-            'invoice_id': invoice_id,
-            'region': region,
-            'content_fingerprint': content_fingerprint,
-            'usd_amount': usd_amount,
-            'timestamp': current_time.isoformat()
-        })
+        records = self.cross_regional_database.setdefault(region, deque())
+        record = FingerprintRecord(
+            timestamp=current_time,
+            invoice_id=invoice_id,
+            region=region,
+            content_fingerprint=content_fingerprint,
+            usd_amount=usd_amount,
+            lsh_keys=lsh_keys,
+            simhash=content_simhash,
+            sequence=next(self._record_sequence)
+        )
+        records.append(record)
+        self._db_size += 1
+        for key in lsh_keys:
+            self._lsh_buckets.setdefault(key, []).append(record)
 
         return {
             "fraud_detected": fraud_detected,
@@ -437,24 +772,75 @@ class ApteanAIMasterSystem:
             "regions_affected": len(set(dup['region'] for dup in potential_duplicates)) + 1 if potential_duplicates else 1
         }
 
-    def _create_content_fingerprint(self, invoice_text: str) -> str:
-        """Create normalized content fingerprint for comparison"""
+    def _evict_expired(self, cutoff: float):
+        """Remove records with timestamps before cutoff from every region and the LSH index"""
+
+        for records in self.cross_regional_database.values():
+            while records and records[0].timestamp < cutoff:
+                self._lsh_remove(records.popleft())
+                self._db_size -= 1
+
+    def _content_minhash(self, content_fingerprint: str) -> Tuple[int, ...]:
+        """MinHash signature of the fingerprint's 5-byte shingles (one-permutation hashing)"""
+
+        num_perm = self.minhash_num_perm
+        signature = [_EMPTY_MINHASH_BIN] * num_perm
+        data = content_fingerprint.encode()
+        for i in range(max(1, len(data) - 4)):
+            # crc32 rather than hash(): signatures must be stable across processes
+            h = zlib.crc32(data[i:i + 5])
+            bucket, value = h % num_perm, h // num_perm
+            if value < signature[bucket]:
+                signature[bucket] = value
+
+        return tuple(signature)
+
+    def _content_simhash(self, content_fingerprint: str) -> int:
+        """64-bit SimHash of the fingerprint's 3-byte shingles"""
+
+        data = content_fingerprint.encode()
+        digests = b''.join(
+            hashlib.blake2b(data[i:i + 3], digest_size=8).digest() for i in range(max(1, len(data) - 2))
+        )
+        shingle_count = len(digests) // 8
 
-        # Normalize content
-        normalized = invoice_text.lower()
+        # Majority vote per bit: byte column k of the digests holds bits 8k..8k+7
+        simhash = 0
+        for byte_index in range(8):
+            column = digests[byte_index::8]
+            for bit, table in enumerate(_SIMHASH_BIT_TABLES):
+                if 2 * column.translate(table).count(1) > shingle_count:
+                    simhash |= 1 << (8 * byte_index + bit)
 
-        # Remove currency symbols and amounts
-        normalized = re.sub(r'[\$€£₹¥]', 'CURRENCY', normalized)
-        normalized = re.sub(r'\d+[,.]?\d*', 'AMOUNT', normalized)
+        return simhash
 
-        # Remove invoice numbers
-        normalized = re.sub(r'invoice\s*#?:?\s*[a-z0-9-]+', 'INVOICE_ID', normalized)
+    def _lsh_keys(self, minhash: Tuple[int, ...]) -> Tuple[int, ...]:
+        """LSH bucket keys for a MinHash signature: hash((band index, band values)) per band"""
 
-        # Remove dates  
-        normalized = re.sub(r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}', 'DATE', normalized)
+        # Tuples of ints hash the same in every process; a rare collision only adds a candidate
+        # that the ratio check rejects
+        rows = self.lsh_band_rows
+        return tuple(hash((band, minhash[band * rows:(band + 1) * rows])) for band in range(len(minhash) // rows))
+
+    def _lsh_remove(self, record: FingerprintRecord):
+        """Remove an evicted record from its LSH buckets"""
+
+        for key in record.lsh_keys:
+            bucket = self._lsh_buckets.get(key)
+            if bucket is not None:
+                bucket.remove(record)
+                if not bucket:
+                    del self._lsh_buckets[key]
+
+    def _create_content_fingerprint(self, invoice_text_lower: str) -> str:
+        """Create normalized content fingerprint for comparison"""
+
+        # Replace currency symbols, amounts and invoice numbers with placeholder tokens
+        tokens = self._FP_TOKENS
+        normalized = self._FP_RE.sub(lambda match: tokens[match.lastindex], invoice_text_lower)
 
         # Normalize whitespace
-        normalized = re.sub(r'\s+', ' ', normalized.strip())
+        normalized = self._FP_WS.sub(' ', normalized.strip())
 
         return normalized
 
@@ -476,11 +862,11 @@ class ApteanAIMasterSystem:
             factors.append(("currency_high_confidence", 0.1))
 
         # Vendor verification
-        if vendor_result['legitimacy_status'] == "LEGITIMATE":
+        if vendor_result['legitimacy_status'] == _STATUS_LEGITIMATE:
             factors.append(("vendor_legitimate", 0.3))
-        elif vendor_result['legitimacy_status'] == "FRAUDULENT":
+        elif vendor_result['legitimacy_status'] == _STATUS_FRAUDULENT:
             factors.append(("vendor_fraudulent", -0.5))
-        elif vendor_result['risk_level'] == "CRITICAL":
+        elif vendor_result['risk_level'] == _RISK_CRITICAL:
             factors.append(("vendor_critical_risk", -0.3))
 
         # Fraud detection
@@ -501,17 +887,17 @@ class ApteanAIMasterSystem:
 
         # Generate recommendation
         if fraud_result['fraud_detected'] and fraud_result['confidence'] > 0.85:
-            recommendation = "🚨 BLOCK - High fraud risk detected"
-        elif vendor_result['legitimacy_status'] == "FRAUDULENT":
-            recommendation = "🚨 BLOCK - Fraudulent vendor detected" 
-        elif vendor_result['risk_level'] == "CRITICAL":
-            recommendation = "⚠️ MANUAL REVIEW - Critical risk requires approval"
+            recommendation = _RECOMMEND_BLOCK_FRAUD
+        elif vendor_result['legitimacy_status'] == _STATUS_FRAUDULENT:
+            recommendation = _RECOMMEND_BLOCK_VENDOR
+        elif vendor_result['risk_level'] == _RISK_CRITICAL:
+            recommendation = _RECOMMEND_MANUAL_REVIEW
         elif overall_confidence > 0.8:
-            recommendation = "✅ APPROVE - All checks passed"
+            recommendation = _RECOMMEND_APPROVE
         elif overall_confidence > 0.6:
-            recommendation = "⚡ ENHANCED VERIFICATION - Additional checks required"
+            recommendation = _RECOMMEND_ENHANCED
         else:
-            recommendation = "❓ INSUFFICIENT DATA - Gather more information"
+            recommendation = _RECOMMEND_INSUFFICIENT
 
         return {
             "recommendation": recommendation,
@@ -552,12 +938,24 @@ class ApteanAIMasterSystem:
         """Get system performance statistics"""
         return {
             "processing_stats": self.processing_stats,
-            "database_size": len(self.cross_regional_database),
+            "database_size": self._db_size,
             "supported_regions": list(self.regional_centers.keys()),
             "supported_currencies": list(self.currency_patterns.keys()),
             "fraud_detection_rate": (self.processing_stats["frauds_detected"] / max(1, self.processing_stats["total_invoices_processed"])) * 100
         }
 
+# PROCESS POOL WORKERS (read-only stages for ApteanAIMasterSystem.process_invoices)
+_stage_worker_system = None
+
+def _init_stage_worker(system: "ApteanAIMasterSystem"):
+    """Keep the caller's (database-free) system instance for this worker process"""
+    global _stage_worker_system
+    _stage_worker_system = system
+
+def _run_stateless_stages(invoices: List[Dict]) -> List[Dict]:
+    """Run the read-only stages for a chunk of invoices in a worker process"""
+    return _stage_worker_system._batch_stateless_stages(invoices)
+
 # COMPREHENSIVE DEMO FUNCTION
 def demo_master_ai_system():
     """Comprehensive demo of the Master AI System"""
@@ -654,4 +1052,7 @@ Payment Terms: Net 15"""
     print("✅ Processing time: 2-5 seconds vs 2-4 hours manual")
 
 if __name__ == "__main__":
+    # Show the per-invoice progress log alongside the demo output
+    logging.basicConfig(stream=sys.stdout, format="%(message)s")
+    logger.setLevel(logging.DEBUG)
     demo_master_ai_system()
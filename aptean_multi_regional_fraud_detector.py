@@ -5,12 +5,114 @@
 import re
 import json
 import hashlib
-from dataclasses import dataclass
-from typing import Dict, List, Tuple, Optional
-from datetime import datetime, timedelta
+import bisect
+import functools
+import itertools
+from collections import Counter, OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple, Optional, Union
+from datetime import datetime
 import difflib
 
-@dataclass
+try:
+    from rapidfuzz import fuzz
+except ImportError:  # optional C++ similarity backend; difflib is used when it is not installed
+    fuzz = None
+
+# PRECOMPILED PATTERNS (compiled once at import, reused for every invoice)
+_VENDOR_RES = tuple(re.compile(pattern, re.IGNORECASE) for pattern in [
+    r"From:\s*(.+?)\n",
+    r"Vendor:\s*(.+?)\n",
+    r"Supplier:\s*(.+?)\n",
+    r"Company:\s*(.+?)\n"
+])
+_LINE_RES = tuple(re.compile(pattern, re.IGNORECASE) for pattern in [
+    r"Description:\s*(.+?)\n",
+    r"Product:\s*(.+?)\n",
+    r"Service:\s*(.+?)\n",
+    r"Item:\s*(.+?)\n"
+])
+_AMOUNT_RES = tuple(re.compile(pattern) for pattern in [
+    r"[\$€£₹¥]\s*([\d,]+\.?\d*)",
+    r"([\d,]+\.?\d*)\s*(?:USD|EUR|GBP|INR|JPY)"
+])
+_PO_RES = tuple(re.compile(pattern, re.IGNORECASE) for pattern in [
+    r"PO[\s#:-]*([A-Z0-9-]+)",
+    r"Purchase Order[\s#:-]*([A-Z0-9-]+)",
+    r"Reference[\s#:-]*([A-Z0-9-]+)"
+])
+_ADDRESS_RES = tuple(re.compile(pattern, re.IGNORECASE) for pattern in [
+    r"Delivery:\s*(.+?)(?:\n|$)",
+    r"Ship to:\s*(.+?)(?:\n|$)",
+    r"Address:\s*(.+?)(?:\n|$)"
+])
+
+# Case-sensitive lowercase twins of the IGNORECASE field patterns, for scanning pre-lowercased text
+# (case-insensitive scans are several times slower than literal-prefix scans in the re engine)
+_VENDOR_LOWER_RES = tuple(re.compile(pattern.pattern.lower()) for pattern in _VENDOR_RES)
+_LINE_LOWER_RES = tuple(re.compile(pattern.pattern.lower()) for pattern in _LINE_RES)
+_PO_LOWER_RES = tuple(re.compile(pattern.pattern.lower()) for pattern in _PO_RES)
+_ADDRESS_LOWER_RES = tuple(re.compile(pattern.pattern.lower()) for pattern in _ADDRESS_RES)
+# Characters re.IGNORECASE matches to ASCII letters that str.lower() leaves alone
+_IGNORECASE_ONLY_CHARS = ("\u0131", "\u017f")  # dotless i, long s
+# str.lower() maps 'Σ' to 'ς' or 'σ' depending on its neighbours, which the normalization
+# placeholders change, so lowering before substituting only matches the baseline without it
+_CAPITAL_SIGMA = "\u03a3"
+
+_NORMALIZE_CURRENCY_SYMBOL_RE = re.compile(r"[\$€£₹¥]")
+_NORMALIZE_CURRENCY_CODE_RE = re.compile(r"\b(USD|EUR|GBP|INR|JPY|CAD)\b", re.IGNORECASE)
+_NORMALIZE_INVOICE_NUMBER_RE = re.compile(r"Invoice\s*#?:?\s*[A-Z0-9-]+", re.IGNORECASE)
+_NORMALIZE_DATE_RE = re.compile(r"\d{1,2}[/-]\d{1,2}[/-]\d{2,4}")
+_NORMALIZE_AMOUNT_RE = re.compile(r"\d+[,.]?\d*")
+# Case-sensitive twins for pre-lowercased text; the code pattern spells its word boundaries as
+# lookarounds after the literal alternation so the scan can skip ahead on the codes' first letters
+_NORMALIZE_CURRENCY_CODE_LOWER_RE = re.compile(r"(?:usd|eur|gbp|inr|jpy|cad)(?<!\w...)(?!\w)")
+_NORMALIZE_INVOICE_NUMBER_LOWER_RE = re.compile(r"invoice\s*#?:?\s*[a-z0-9-]+")
+_WORD_RE = re.compile(r"\w+")
+
+# Product/Service keywords, then Company/Technology keywords, scanned in one pass
+_KEYWORD_RE = re.compile(
+    r"\b(software|license|consultation|equipment|service|support|maintenance|installation"
+    r"|Microsoft|Office|SAP|Oracle|AWS|Google|Enterprise|Professional|Premium)\b",
+    re.IGNORECASE
+)
+_KEYWORD_LOWER_RE = re.compile(_KEYWORD_RE.pattern.lower())
+
+def _similarity_ratio(a: str, b: str) -> float:
+    """Similarity ratio (0-1) of two strings"""
+
+    if fuzz is not None:
+        return fuzz.ratio(a, b) / 100.0
+
+    return difflib.SequenceMatcher(None, a, b).ratio()
+
+def _scannable_lower(text: str, text_lower: Optional[str] = None) -> Optional[str]:
+    """text_lower (default text.lower()) if lowercase case-sensitive patterns match it like IGNORECASE patterns match text, else None"""
+
+    # Offsets only line up when lowercasing keeps the length (e.g. not for 'İ')
+    if text_lower is None:
+        text_lower = text.lower()
+    if len(text_lower) == len(text) and not any(char in text for char in _IGNORECASE_ONLY_CHARS):
+        return text_lower
+    return None
+
+def _similarity_scores(query: str, choices: List[str]) -> List[float]:
+    """Similarity ratio (0-1) of query against every choice"""
+
+    # A plain fuzz.ratio loop: process.cdist needs numpy, which rapidfuzz doesn't install, and its
+    # thread pool costs more than it saves on a handful of candidates
+    if fuzz is not None:
+        return [fuzz.ratio(query, choice) / 100.0 for choice in choices]
+
+    return [difflib.SequenceMatcher(None, query, choice).ratio() for choice in choices]
+
+@functools.lru_cache(maxsize=4096)
+def _vendor_names_similar(vendor1: str, vendor2: str) -> bool:
+    """Whether two lowercased vendor names are similar enough to flag a pair (vendor names repeat, so memoized)"""
+
+    return vendor1 == vendor2 or _similarity_ratio(vendor1, vendor2) > 0.8
+
+@dataclass(slots=True)
 class InvoiceFingerprint:
     content_hash: str
     vendor_name: str
@@ -20,8 +122,30 @@ class InvoiceFingerprint:
     delivery_address: str
     normalized_content: str
     extracted_keywords: List[str]
+    vendor_name_lower: str = field(init=False)
+    po_reference_lower: str = field(init=False)
+    delivery_address_lower: str = field(init=False)
+    line_items_lower: List[str] = field(init=False)
+    line_item_shingles: frozenset = field(init=False)
+    content_char_counts: Counter = field(init=False)
+    address_tokens: frozenset = field(init=False)
+
+    def __post_init__(self):
+        # Comparisons are case-insensitive, so fields are lowercased once here rather than per pair
+        self.vendor_name_lower = self.vendor_name.lower()
+        self.po_reference_lower = self.po_reference.lower()
+        self.delivery_address_lower = self.delivery_address.lower()
+        # Shingled once here so line-item comparisons are a set intersection
+        self.line_items_lower = [item.lower() for item in self.line_items]
+        self.line_item_shingles = frozenset(
+            item[start:start + 3] for item in self.line_items_lower for start in range(max(1, len(item) - 2))
+        )
+        # Character counts bound the content similarity of a pair before any ratio is computed
+        self.content_char_counts = Counter(self.normalized_content)
+        # Canonical address form: word order, punctuation and spacing don't matter
+        self.address_tokens = frozenset(_WORD_RE.findall(self.delivery_address_lower))
 
-@dataclass
+@dataclass(slots=True)
 class RegionalInvoice:
     invoice_id: str
     region: str
@@ -30,8 +154,15 @@ class RegionalInvoice:
     submission_timestamp: str
     fingerprint: InvoiceFingerprint
     processing_status: str
+    _epoch: float = 0.0  # submission time as a POSIX timestamp, for window arithmetic
+    _usd: Optional[float] = None  # total_amount in USD, converted on first use
+
+    def __post_init__(self):
+        # Invoices built from external input may only carry the string timestamp; parse it once here
+        if not self._epoch and self.submission_timestamp:
+            self._epoch = datetime.fromisoformat(self.submission_timestamp).timestamp()
 
-@dataclass
+@dataclass(slots=True)
 class FraudAlert:
     alert_id: str
     fraud_type: str
@@ -55,8 +186,19 @@ class ApteanRegionalFraudDetector:
             "Canada": {"currency": "CAD", "timezone": "EST/PST", "offices": ["Toronto", "Vancouver", "Montreal"]}
         }
 
-        # Cross-regional invoice database (simulated)
-        self.cross_regional_database = []
+        # Cross-regional invoice database (simulated), oldest first; invoices leave once outside the time window
+        self.cross_regional_database = deque()
+
+        # Database indexes: (sequence, invoice) entries sorted by submission epoch (with the epochs alongside
+        # for bisecting) and grouped by lowercased PO reference
+        self._epochs = []
+        self._by_idx = []
+        self._by_po = {}
+        self._record_sequence = itertools.count()
+
+        # LRU cache of normalized-content similarity per (current, existing) content-hash pair
+        self._pair_cache = OrderedDict()
+        self._pair_cache_size = 4096
 
         # Currency conversion rates for normalization
         self.currency_rates_to_usd = {
@@ -120,58 +262,55 @@ class ApteanRegionalFraudDetector:
         # Create content fingerprint
         fingerprint = self._generate_content_fingerprint(invoice_text)
 
+        # Whole seconds, matching the resolution of the string timestamp
+        submitted_at = datetime.now().replace(microsecond=0)
+
         regional_invoice = RegionalInvoice(
             invoice_id=invoice_data.get("invoice_id", ""),
             region=invoice_data.get("region", ""),
             currency=invoice_data.get("currency", ""),
             total_amount=invoice_data.get("total_amount", 0.0),
-            submission_timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            submission_timestamp=submitted_at.strftime("%Y-%m-%d %H:%M:%S"),
             fingerprint=fingerprint,
-            processing_status="pending"
+            processing_status="pending",
+            _epoch=submitted_at.timestamp()
         )
 
         return regional_invoice
 
-    def _generate_content_fingerprint(self, invoice_text: str) -> InvoiceFingerprint:
+    def _generate_content_fingerprint(self, invoice_text: Union[str, bytes]) -> InvoiceFingerprint:
         """Generate unique fingerprint for invoice content"""
 
-        # 1. EXTRACT VENDOR NAME
-        vendor_patterns = [
-            r"From:\s*(.+?)\n",
-            r"Vendor:\s*(.+?)\n",
-            r"Supplier:\s*(.+?)\n",
-            r"Company:\s*(.+?)\n"
-        ]
+        # Raw bytes from a file or socket (bytes, bytearray, memoryview) are decoded once, straight from the buffer
+        if not isinstance(invoice_text, str):
+            invoice_text = str(invoice_text, "utf-8", "replace")
+
+        # Scan the lowercased text with case-sensitive patterns and slice field values out of the original text
+        invoice_text_lower = _scannable_lower(invoice_text)
+        if invoice_text_lower is not None:
+            scan_text = invoice_text_lower
+            vendor_res, line_res, po_res, address_res = _VENDOR_LOWER_RES, _LINE_LOWER_RES, _PO_LOWER_RES, _ADDRESS_LOWER_RES
+        else:
+            scan_text = invoice_text
+            vendor_res, line_res, po_res, address_res = _VENDOR_RES, _LINE_RES, _PO_RES, _ADDRESS_RES
 
+        # 1. EXTRACT VENDOR NAME
         vendor_name = ""
-        for pattern in vendor_patterns:
-            match = re.search(pattern, invoice_text, re.IGNORECASE)
+        for pattern in vendor_res:
+            match = pattern.search(scan_text)
             if match:
-                vendor_name = match.group(1).strip()
+                vendor_name = invoice_text[match.start(1):match.end(1)].strip()
                 break
 
         # 2. EXTRACT LINE ITEMS
         line_items = []
-        line_patterns = [
-            r"Description:\s*(.+?)\n",
-            r"Product:\s*(.+?)\n", 
-            r"Service:\s*(.+?)\n",
-            r"Item:\s*(.+?)\n"
-        ]
-
-        for pattern in line_patterns:
-            matches = re.findall(pattern, invoice_text, re.IGNORECASE)
-            line_items.extend([item.strip() for item in matches])
-
-        # 3. EXTRACT AMOUNTS
-        amount_patterns = [
-            r"[\$€£₹¥]\s*([\d,]+\.?\d*)",
-            r"([\d,]+\.?\d*)\s*(?:USD|EUR|GBP|INR|JPY)"
-        ]
+        for pattern in line_res:
+            line_items.extend([invoice_text[match.start(1):match.end(1)].strip() for match in pattern.finditer(scan_text)])
 
+        # 3. EXTRACT AMOUNTS (currency codes are case-sensitive, so these scan the original text)
         amounts = []
-        for pattern in amount_patterns:
-            matches = re.findall(pattern, invoice_text)
+        for pattern in _AMOUNT_RES:
+            matches = pattern.findall(invoice_text)
             for match in matches:
                 try:
                     amount = float(match.replace(",", ""))
@@ -180,41 +319,29 @@ class ApteanRegionalFraudDetector:
                     pass
 
         # 4. EXTRACT PO REFERENCE
-        po_patterns = [
-            r"PO[\s#:-]*([A-Z0-9-]+)",
-            r"Purchase Order[\s#:-]*([A-Z0-9-]+)",
-            r"Reference[\s#:-]*([A-Z0-9-]+)"
-        ]
-
         po_reference = ""
-        for pattern in po_patterns:
-            match = re.search(pattern, invoice_text, re.IGNORECASE)
+        for pattern in po_res:
+            match = pattern.search(scan_text)
             if match:
-                po_reference = match.group(1).strip()
+                po_reference = invoice_text[match.start(1):match.end(1)].strip()
                 break
 
         # 5. EXTRACT DELIVERY ADDRESS
-        address_patterns = [
-            r"Delivery:\s*(.+?)(?:\n|$)",
-            r"Ship to:\s*(.+?)(?:\n|$)",
-            r"Address:\s*(.+?)(?:\n|$)"
-        ]
-
         delivery_address = ""
-        for pattern in address_patterns:
-            match = re.search(pattern, invoice_text, re.IGNORECASE)
+        for pattern in address_res:
+            match = pattern.search(scan_text)
             if match:
-                delivery_address = match.group(1).strip()
+                delivery_address = invoice_text[match.start(1):match.end(1)].strip()
                 break
 
         # 6. CREATE NORMALIZED CONTENT (for similarity comparison)
-        normalized_content = self._normalize_content_for_comparison(invoice_text)
+        normalized_content = self._normalize_content_for_comparison(invoice_text, invoice_text_lower)
 
         # 7. EXTRACT KEYWORDS
-        keywords = self._extract_keywords(invoice_text)
+        keywords = self._extract_keywords(invoice_text, invoice_text_lower)
 
         # 8. GENERATE CONTENT HASH
-        content_hash = hashlib.md5(normalized_content.encode()).hexdigest()
+        content_hash = hashlib.blake2b(normalized_content.encode(), digest_size=16).hexdigest()
 
         return InvoiceFingerprint(
             content_hash=content_hash,
@@ -227,59 +354,76 @@ class ApteanRegionalFraudDetector:
             extracted_keywords=keywords
         )
 
-    def _normalize_content_for_comparison(self, invoice_text: str) -> str:
+    def _normalize_content_for_comparison(self, invoice_text: str, invoice_text_lower: Optional[str] = None) -> str:
         """Normalize invoice content for cross-regional comparison"""
 
+        if invoice_text_lower is None:
+            invoice_text_lower = _scannable_lower(invoice_text)
+
+        # The result is lowercased anyway, so when possible work on the lowercased text with
+        # case-sensitive patterns and lowercase placeholders
+        if invoice_text_lower is not None and _CAPITAL_SIGMA not in invoice_text:
+            normalized = _NORMALIZE_CURRENCY_SYMBOL_RE.sub("currency", invoice_text_lower)
+            normalized = _NORMALIZE_CURRENCY_CODE_LOWER_RE.sub("currency", normalized)
+            normalized = _NORMALIZE_INVOICE_NUMBER_LOWER_RE.sub("invoice_number", normalized)
+            normalized = _NORMALIZE_DATE_RE.sub("date", normalized)
+            normalized = _NORMALIZE_AMOUNT_RE.sub("amount", normalized)
+            return " ".join(normalized.split())
+
         # Remove currency symbols and replace with placeholder
-        normalized = re.sub(r"[\$€£₹¥]", "CURRENCY", invoice_text)
+        normalized = _NORMALIZE_CURRENCY_SYMBOL_RE.sub("CURRENCY", invoice_text)
 
         # Remove currency codes
-        normalized = re.sub(r"\b(USD|EUR|GBP|INR|JPY|CAD)\b", "CURRENCY", normalized, flags=re.IGNORECASE)
+        normalized = _NORMALIZE_CURRENCY_CODE_RE.sub("CURRENCY", normalized)
 
         # Remove invoice numbers (different across regions)
-        normalized = re.sub(r"Invoice\s*#?:?\s*[A-Z0-9-]+", "INVOICE_NUMBER", normalized, flags=re.IGNORECASE)
+        normalized = _NORMALIZE_INVOICE_NUMBER_RE.sub("INVOICE_NUMBER", normalized)
 
         # Remove dates (may vary slightly)
-        normalized = re.sub(r"\d{1,2}[/-]\d{1,2}[/-]\d{2,4}", "DATE", normalized)
+        normalized = _NORMALIZE_DATE_RE.sub("DATE", normalized)
 
         # Remove amounts (focus on content structure)
-        normalized = re.sub(r"\d+[,.]?\d*", "AMOUNT", normalized)
+        normalized = _NORMALIZE_AMOUNT_RE.sub("AMOUNT", normalized)
 
-        # Normalize whitespace
-        normalized = re.sub(r"\s+", " ", normalized.strip())
+        # Normalize whitespace (str.split() splits on exactly the characters \s matches)
+        normalized = " ".join(normalized.split())
 
         return normalized.lower()
 
-    def _extract_keywords(self, invoice_text: str) -> List[str]:
+    def _extract_keywords(self, invoice_text: str, invoice_text_lower: Optional[str] = None) -> List[str]:
         """Extract key terms for semantic matching"""
 
-        # Important keywords that indicate invoice content
-        keywords = []
-
-        # Product/Service keywords
-        product_keywords = re.findall(r"\b(software|license|consultation|equipment|service|support|maintenance|installation)\b", invoice_text, re.IGNORECASE)
-        keywords.extend([kw.lower() for kw in product_keywords])
+        if invoice_text_lower is None:
+            invoice_text_lower = _scannable_lower(invoice_text)
 
-        # Company/Technology keywords  
-        tech_keywords = re.findall(r"\b(Microsoft|Office|SAP|Oracle|AWS|Google|Enterprise|Professional|Premium)\b", invoice_text, re.IGNORECASE)
-        keywords.extend([kw.lower() for kw in tech_keywords])
+        # Important keywords that indicate invoice content (product/service and company/technology)
+        if invoice_text_lower is not None:
+            keywords = _KEYWORD_LOWER_RE.findall(invoice_text_lower)
+        else:
+            keywords = [kw.lower() for kw in _KEYWORD_RE.findall(invoice_text)]
 
-        return list(set(keywords))  # Remove duplicates
+        return list(dict.fromkeys(keywords))  # Remove duplicates, keeping first-seen order
 
     def _search_cross_regional_duplicates(self, current_invoice: RegionalInvoice) -> List[RegionalInvoice]:
         """Search for potential duplicates across all regions"""
 
         potential_duplicates = []
 
-        # Search within time window
-        current_time = datetime.strptime(current_invoice.submission_timestamp, "%Y-%m-%d %H:%M:%S")
-        time_window = timedelta(hours=self.fraud_patterns["time_window_hours"])
+        # Search within time window: bisect the sorted epochs for the window's slice (a second of slack
+        # keeps float rounding at the edges from dropping a candidate; the exact test below decides)
+        current_epoch = current_invoice._epoch
+        time_window = self.fraud_patterns["time_window_hours"] * 3600
+        lo = bisect.bisect_left(self._epochs, current_epoch - time_window - 1.0)
+        hi = bisect.bisect_right(self._epochs, current_epoch + time_window + 1.0)
+        candidates = sorted(self._by_idx[lo:hi])  # back to database insertion order
 
-        for existing_invoice in self.cross_regional_database:
-            existing_time = datetime.strptime(existing_invoice.submission_timestamp, "%Y-%m-%d %H:%M:%S")
+        # Invoices sharing the PO reference pass the quick check outright
+        po_key = current_invoice.fingerprint.po_reference_lower
+        po_sequences = {sequence for sequence, _ in self._by_po.get(po_key, ())} if po_key else set()
 
+        for sequence, existing_invoice in candidates:
             # Skip if outside time window
-            if abs(current_time - existing_time) > time_window:
+            if abs(current_epoch - existing_invoice._epoch) > time_window:
                 continue
 
             # Skip if same region (different fraud type)
@@ -287,7 +431,7 @@ class ApteanRegionalFraudDetector:
                 continue
 
             # Check for potential similarity
-            if self._quick_similarity_check(current_invoice, existing_invoice):
+            if sequence in po_sequences or self._quick_similarity_check(current_invoice, existing_invoice):
                 potential_duplicates.append(existing_invoice)
 
         return potential_duplicates
@@ -296,24 +440,16 @@ class ApteanRegionalFraudDetector:
         """Quick pre-filter for potential duplicates"""
 
         # Check PO reference match (strong indicator)
-        if (invoice1.fingerprint.po_reference and invoice2.fingerprint.po_reference and
-            invoice1.fingerprint.po_reference.lower() == invoice2.fingerprint.po_reference.lower()):
+        if invoice1.fingerprint.po_reference_lower and invoice1.fingerprint.po_reference_lower == invoice2.fingerprint.po_reference_lower:
             return True
 
         # Check vendor name similarity
-        if invoice1.fingerprint.vendor_name and invoice2.fingerprint.vendor_name:
-            vendor_similarity = difflib.SequenceMatcher(
-                None, 
-                invoice1.fingerprint.vendor_name.lower(), 
-                invoice2.fingerprint.vendor_name.lower()
-            ).ratio()
-
-            if vendor_similarity > 0.8:
+        if invoice1.fingerprint.vendor_name_lower and invoice2.fingerprint.vendor_name_lower:
+            if _vendor_names_similar(invoice1.fingerprint.vendor_name_lower, invoice2.fingerprint.vendor_name_lower):
                 return True
 
-        # Check delivery address match
-        if (invoice1.fingerprint.delivery_address and invoice2.fingerprint.delivery_address and
-            invoice1.fingerprint.delivery_address.lower() in invoice2.fingerprint.delivery_address.lower()):
+        # Check delivery address match (every address word of invoice1 appears in invoice2's)
+        if invoice1.fingerprint.address_tokens and invoice1.fingerprint.address_tokens <= invoice2.fingerprint.address_tokens:
             return True
 
         return False
@@ -330,10 +466,31 @@ class ApteanRegionalFraudDetector:
             "temporal_analysis": {}
         }
 
-        for duplicate in potential_duplicates:
-            match_evidence = self._compare_invoices_detailed(current_invoice, duplicate)
+        similarity_threshold = self.fraud_patterns["similarity_threshold"]
+
+        # Cheap field scores and the content-similarity bound for every candidate, scored in one batch
+        all_field_similarities = [self._field_similarities(current_invoice, duplicate) for duplicate in potential_duplicates]
+        upper_bounds = self._score_batch([
+            (self._content_similarity_bound(current_invoice.fingerprint, duplicate.fingerprint),) + field_similarities
+            for duplicate, field_similarities in zip(potential_duplicates, all_field_similarities)
+        ])
+
+        # Skip the content comparison when even its upper bound can't lift the pair over the threshold
+        survivors = [
+            (duplicate, field_similarities)
+            for duplicate, field_similarities, upper_bound in zip(potential_duplicates, all_field_similarities, upper_bounds)
+            if upper_bound > similarity_threshold - 1e-9
+        ]
+
+        # Content similarity of every surviving candidate in one batched call
+        content_similarities = self._content_similarities(
+            current_invoice.fingerprint, [duplicate.fingerprint for duplicate, _ in survivors]
+        )
+
+        for (duplicate, field_similarities), content_similarity in zip(survivors, content_similarities):
+            match_evidence = self._compare_invoices_detailed(current_invoice, duplicate, field_similarities, content_similarity)
 
-            if match_evidence["overall_similarity"] > self.fraud_patterns["similarity_threshold"]:
+            if match_evidence["overall_similarity"] > similarity_threshold:
                 evidence["matches"].append(duplicate)
                 evidence["similarity_scores"][duplicate.invoice_id] = match_evidence["overall_similarity"]
                 evidence["matching_elements"][duplicate.invoice_id] = match_evidence["matching_elements"]
@@ -342,7 +499,9 @@ class ApteanRegionalFraudDetector:
 
         return evidence
 
-    def _compare_invoices_detailed(self, invoice1: RegionalInvoice, invoice2: RegionalInvoice) -> Dict:
+    def _compare_invoices_detailed(self, invoice1: RegionalInvoice, invoice2: RegionalInvoice,
+                                 field_similarities: Optional[Tuple[float, float, float]] = None,
+                                 content_similarity: Optional[float] = None) -> Dict:
         """Detailed comparison between two invoices"""
 
         comparison = {
@@ -353,40 +512,16 @@ class ApteanRegionalFraudDetector:
         }
 
         # 1. CONTENT SIMILARITY
-        content_similarity = difflib.SequenceMatcher(
-            None, 
-            invoice1.fingerprint.normalized_content, 
-            invoice2.fingerprint.normalized_content
-        ).ratio()
+        if content_similarity is None:
+            content_similarity = self._content_similarities(invoice1.fingerprint, [invoice2.fingerprint])[0]
 
-        # 2. PO REFERENCE MATCH
-        po_match = 0.0
-        if (invoice1.fingerprint.po_reference and invoice2.fingerprint.po_reference and
-            invoice1.fingerprint.po_reference.lower() == invoice2.fingerprint.po_reference.lower()):
-            po_match = 1.0
-
-        # 3. DELIVERY ADDRESS SIMILARITY
-        address_similarity = 0.0
-        if invoice1.fingerprint.delivery_address and invoice2.fingerprint.delivery_address:
-            address_similarity = difflib.SequenceMatcher(
-                None,
-                invoice1.fingerprint.delivery_address.lower(),
-                invoice2.fingerprint.delivery_address.lower()
-            ).ratio()
-
-        # 4. LINE ITEMS SIMILARITY
-        line_items_similarity = self._compare_line_items(
-            invoice1.fingerprint.line_items, 
-            invoice2.fingerprint.line_items
-        )
+        # 2-4. PO REFERENCE MATCH, DELIVERY ADDRESS AND LINE ITEMS SIMILARITY
+        if field_similarities is None:
+            field_similarities = self._field_similarities(invoice1, invoice2)
+        po_match, address_similarity, line_items_similarity = field_similarities
 
         # 5. CALCULATE WEIGHTED OVERALL SIMILARITY
-        overall_similarity = (
-            content_similarity * 0.3 +
-            po_match * self.fraud_patterns["po_reference_weight"] +
-            address_similarity * self.fraud_patterns["delivery_address_weight"] +
-            line_items_similarity * self.fraud_patterns["line_items_weight"]
-        )
+        overall_similarity = self._score_batch([(content_similarity, po_match, address_similarity, line_items_similarity)])[0]
 
         # 6. CURRENCY ANALYSIS
         currency_analysis = self._analyze_currency_relationship(invoice1, invoice2)
@@ -408,29 +543,92 @@ class ApteanRegionalFraudDetector:
 
         return comparison
 
-    def _compare_line_items(self, items1: List[str], items2: List[str]) -> float:
-        """Compare line items between invoices"""
+    def _field_similarities(self, invoice1: RegionalInvoice, invoice2: RegionalInvoice) -> Tuple[float, float, float]:
+        """PO reference match, delivery address similarity and line items similarity of a pair"""
 
-        if not items1 or not items2:
-            return 0.0
+        po_match = 0.0
+        if invoice1.fingerprint.po_reference_lower and invoice1.fingerprint.po_reference_lower == invoice2.fingerprint.po_reference_lower:
+            po_match = 1.0
+
+        address_similarity = 0.0
+        if invoice1.fingerprint.delivery_address_lower and invoice2.fingerprint.delivery_address_lower:
+            address_similarity = _similarity_ratio(
+                invoice1.fingerprint.delivery_address_lower,
+                invoice2.fingerprint.delivery_address_lower
+            )
+
+        line_items_similarity = self._compare_line_items(
+            invoice1.fingerprint.line_item_shingles, 
+            invoice2.fingerprint.line_item_shingles
+        )
+
+        return po_match, address_similarity, line_items_similarity
+
+    def _score_batch(self, score_rows: List[Tuple[float, float, float, float]]) -> List[float]:
+        """Weighted overall similarity of (content, PO, address, line items) score rows"""
+
+        # Weights are read once per batch rather than once per candidate
+        po_weight = self.fraud_patterns["po_reference_weight"]
+        address_weight = self.fraud_patterns["delivery_address_weight"]
+        line_items_weight = self.fraud_patterns["line_items_weight"]
+
+        return [
+            content_similarity * 0.3 + po_match * po_weight + address_similarity * address_weight + line_items_similarity * line_items_weight
+            for content_similarity, po_match, address_similarity, line_items_similarity in score_rows
+        ]
 
-        total_similarity = 0.0
-        comparisons = 0
+    def _content_similarity_bound(self, fingerprint1: InvoiceFingerprint, fingerprint2: InvoiceFingerprint) -> float:
+        """Upper bound on the normalized-content ratio: shared character counts over total length"""
 
-        for item1 in items1:
-            for item2 in items2:
-                similarity = difflib.SequenceMatcher(None, item1.lower(), item2.lower()).ratio()
-                total_similarity += similarity
-                comparisons += 1
+        total_length = len(fingerprint1.normalized_content) + len(fingerprint2.normalized_content)
+        if not total_length:
+            return 1.0
 
-        return total_similarity / comparisons if comparisons > 0 else 0.0
+        shared_chars = sum((fingerprint1.content_char_counts & fingerprint2.content_char_counts).values())
+        return 2.0 * shared_chars / total_length
+
+    def _content_similarities(self, fingerprint: InvoiceFingerprint, candidates: List[InvoiceFingerprint]) -> List[float]:
+        """Normalized-content similarity against each candidate, memoized since resubmitted texts repeat the same hash pairs"""
+
+        # Ordered keys: difflib's ratio is not guaranteed to be symmetric
+        keys = [(fingerprint.content_hash, candidate.content_hash) for candidate in candidates]
+        similarities = []
+        for key, candidate in zip(keys, candidates):
+            # Resubmitted content (same hash) is identical, which both backends score as exactly 1.0
+            if key[0] == key[1] and candidate.normalized_content == fingerprint.normalized_content:
+                similarities.append(1.0)
+                continue
+
+            similarity = self._pair_cache.get(key)
+            if similarity is not None:
+                self._pair_cache.move_to_end(key)
+            similarities.append(similarity)
+
+        # Score every cache miss in one batch
+        misses = [index for index, similarity in enumerate(similarities) if similarity is None]
+        scores = _similarity_scores(fingerprint.normalized_content, [candidates[index].normalized_content for index in misses])
+        for index, similarity in zip(misses, scores):
+            similarities[index] = similarity
+            self._pair_cache[keys[index]] = similarity
+            if len(self._pair_cache) > self._pair_cache_size:
+                self._pair_cache.popitem(last=False)
+
+        return similarities
+
+    def _compare_line_items(self, shingles1: frozenset, shingles2: frozenset) -> float:
+        """Compare line items between invoices (Jaccard similarity of their character 3-gram sets)"""
+
+        if not shingles1 or not shingles2:
+            return 0.0
+
+        return len(shingles1 & shingles2) / len(shingles1 | shingles2)
 
     def _analyze_currency_relationship(self, invoice1: RegionalInvoice, invoice2: RegionalInvoice) -> Dict:
         """Analyze if amounts match after currency conversion"""
 
         # Convert both amounts to USD for comparison
-        amount1_usd = invoice1.total_amount * self.currency_rates_to_usd.get(invoice1.currency, 1.0)
-        amount2_usd = invoice2.total_amount * self.currency_rates_to_usd.get(invoice2.currency, 1.0)
+        amount1_usd = self._usd_amount(invoice1)
+        amount2_usd = self._usd_amount(invoice2)
 
         # Calculate variance
         if amount1_usd > 0:
@@ -446,14 +644,17 @@ class ApteanRegionalFraudDetector:
             "currency_pair": f"{invoice1.currency}-{invoice2.currency}"
         }
 
+    def _usd_amount(self, invoice: RegionalInvoice) -> float:
+        """Invoice total in USD, converted once and kept on the invoice"""
+
+        if invoice._usd is None:
+            invoice._usd = invoice.total_amount * self.currency_rates_to_usd.get(invoice.currency, 1.0)
+        return invoice._usd
+
     def _analyze_submission_timing(self, invoice1: RegionalInvoice, invoice2: RegionalInvoice) -> Dict:
         """Analyze submission timing patterns"""
 
-        time1 = datetime.strptime(invoice1.submission_timestamp, "%Y-%m-%d %H:%M:%S")
-        time2 = datetime.strptime(invoice2.submission_timestamp, "%Y-%m-%d %H:%M:%S")
-
-        time_diff = abs(time1 - time2)
-        hours_diff = time_diff.total_seconds() / 3600
+        hours_diff = abs(invoice1._epoch - invoice2._epoch) / 3600
 
         return {
             "time_difference_hours": round(hours_diff, 2),
@@ -492,14 +693,8 @@ class ApteanRegionalFraudDetector:
                                 duplicates: List[RegionalInvoice]) -> float:
         """Calculate potential financial loss from fraud"""
 
-        # Convert current invoice to USD
-        current_usd = current_invoice.total_amount * self.currency_rates_to_usd.get(current_invoice.currency, 1.0)
-
         # Add duplicate amounts
-        duplicate_usd = 0.0
-        for duplicate in duplicates:
-            duplicate_amount = duplicate.total_amount * self.currency_rates_to_usd.get(duplicate.currency, 1.0)
-            duplicate_usd += duplicate_amount
+        duplicate_usd = sum((self._usd_amount(duplicate) for duplicate in duplicates), 0.0)
 
         # Total potential loss (assuming one is legitimate)
         return round(duplicate_usd, 2)
@@ -563,6 +758,42 @@ class ApteanRegionalFraudDetector:
         """Add invoice to cross-regional database for future comparisons"""
         self.cross_regional_database.append(invoice)
 
+        entry = (next(self._record_sequence), invoice)
+        # Submissions arrive in time order, so this is an append unless the clock stepped back
+        position = bisect.bisect_right(self._epochs, invoice._epoch)
+        self._epochs.insert(position, invoice._epoch)
+        self._by_idx.insert(position, entry)
+        po_key = invoice.fingerprint.po_reference_lower
+        if po_key:
+            self._by_po.setdefault(po_key, []).append(entry)
+
+        # Later submissions can't fall within the time window of invoices older than this one's
+        self._evict_expired(invoice._epoch - self.fraud_patterns["time_window_hours"] * 3600)
+
+    def _evict_expired(self, cutoff: float):
+        """Remove invoices submitted before cutoff from the database and its indexes"""
+
+        expired_count = bisect.bisect_left(self._epochs, cutoff)
+        if expired_count:
+            del self._epochs[:expired_count]
+            del self._by_idx[:expired_count]
+
+        while self.cross_regional_database and self.cross_regional_database[0]._epoch < cutoff:
+            expired = self.cross_regional_database.popleft()
+            if expired.fingerprint.po_reference_lower:
+                self._remove_index_entry(self._by_po, expired.fingerprint.po_reference_lower, expired)
+
+    def _remove_index_entry(self, index: Dict, key, invoice: RegionalInvoice):
+        """Remove invoice's entry under key, dropping the key once it has no entries left"""
+
+        entries = index[key]
+        for position, (_, indexed_invoice) in enumerate(entries):
+            if indexed_invoice is invoice:
+                del entries[position]
+                break
+        if not entries:
+            del index[key]
+
 # DEMO FUNCTION
 def demo_multi_regional_fraud_detection():
     """Demo the Multi-Regional Fraud Detection system"""
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Regression tests for the Aptean Master AI System
+"""
+
+import unittest
+
+from aptean_master_ai_system import ApteanAIMasterSystem
+
+class CurrencyDetectionTest(unittest.TestCase):
+    """Currency markers that overlap must still count for every currency they match"""
+
+    # text -> (detected currency, largest amount per currency)
+    OVERLAPPING_AMOUNTS = {
+        "C$ 997,706 CAD": ("USD", {"USD": 997706.0, "CAD": 997706.0}),
+        "C$ 300": ("USD", {"USD": 300.0, "CAD": 300.0}),
+        "€500 USD": ("USD", {"USD": 500.0, "EUR": 500.0}),
+        "¥7 usd": ("USD", {"USD": 7.0, "JPY": 7.0}),
+        "Rs. 100 USD": ("USD", {"USD": 100.0, "INR": 0.1}),
+        "¥ 1,000 EUR": ("EUR", {"EUR": 1000.0, "JPY": 1000.0}),
+        "$1,20 USD": ("USD", {"USD": 1.2}),
+    }
+
+    def setUp(self):
+        self.system = ApteanAIMasterSystem()
+
+    def test_overlapping_currency_markers(self):
+        for text, expected in self.OVERLAPPING_AMOUNTS.items():
+            with self.subTest(text=text):
+                self.assertEqual(self.system._detect_currency_and_amounts(text.lower(), text), expected)
+
+    def test_batch_scan_matches_single_scan(self):
+        texts = list(self.OVERLAPPING_AMOUNTS)
+        batch = self.system._batch_detect_currency_and_amounts([text.lower() for text in texts], texts)
+        self.assertEqual(batch, list(self.OVERLAPPING_AMOUNTS.values()))
+
+if __name__ == "__main__":
+    unittest.main()